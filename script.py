@@ -8,9 +8,13 @@ import logging
 import os
 import datetime
 import json
+import hashlib
+import threading
+import queue
 import asyncio
 import aiohttp
-from target_manager import TargetImageManager, check_target_matches
+from collections import OrderedDict
+from target_manager import TargetImageManager
 from roi_manager import ROIManager
 from template_manager import TemplateManager
 from json_manager import JSONManager
@@ -32,6 +36,31 @@ logging.basicConfig(
     ]
 )
 
+# Maximum number of OCR results kept in the per-session cache
+OCR_CACHE_SIZE = 512
+
+# Text line height (px) Tesseract reads best at; ROIs with taller lines can be
+# downscaled towards it, but never by more than OCR_MIN_DOWNSCALE
+OCR_TARGET_HEIGHT = 48
+OCR_MIN_DOWNSCALE = 0.5
+
+def estimate_line_height(gray):
+    """Median height (px) of the text lines in a gray ROI, from its row ink profile
+    
+    Ink is the minority class after Otsu binarization, so both dark-on-light and
+    light-on-dark text work. Returns the ROI height if no lines are found.
+    """
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink_rows = ink.sum(axis=1)
+    if ink_rows.sum() > ink.size / 2:
+        ink_rows = ink.shape[1] - ink_rows  # Light text on a dark background
+    
+    # Runs of rows holding ink (ignoring specks) are the text lines
+    is_text = np.concatenate(([False], ink_rows > ink.shape[1] // 100, [False]))
+    edges = np.flatnonzero(np.diff(is_text.astype(np.int8)))
+    runs = edges[1::2] - edges[0::2]
+    return float(np.median(runs)) if len(runs) else float(gray.shape[0])
+
 class ModernScrollableFrame(ttk.Frame):
     def __init__(self, parent, **kwargs):
         super().__init__(parent, **kwargs)
@@ -90,6 +119,18 @@ class ROIAnalyzerApp:
         self.match_threshold = tk.DoubleVar(value=0.7)
         self.numbers_only = tk.BooleanVar(value=False)
         self.debug_preprocessing = tk.BooleanVar(value=False)
+        self.downscale_large_rois = tk.BooleanVar(value=False)
+        
+        # LRU cache of OCR results keyed by (pixel hash, language, config)
+        self._ocr_cache = OrderedDict()
+        
+        # Per-thread scratch buffers for OCR preprocessing (the real-time
+        # monitor preprocesses from its own thread)
+        self._ocr_buffers = threading.local()
+        
+        # State of the analysis whose target matches are still running, if any
+        self._analysis = None
+        self._analysis_run = 0
         
         # Initialize managers
         self.target_manager = TargetImageManager(self.root)
@@ -406,6 +447,14 @@ class ROIAnalyzerApp:
         )
         debug_check.pack(anchor=tk.W)
         
+        # Downscale large ROIs checkbox
+        downscale_check = ttk.Checkbutton(
+            ocr_settings_frame,
+            text="Downscale large text before OCR (lines taller than 96 px, at most to half size)",
+            variable=self.downscale_large_rois
+        )
+        downscale_check.pack(anchor=tk.W)
+        
         # Right panel for results and logs
         right_panel = ttk.Frame(content_frame, width=400)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(10, 0))
@@ -690,6 +739,20 @@ class ROIAnalyzerApp:
         
         logging.info("All ROIs cleared")
     
+    def _ocr_buffer(self, name, shape):
+        """Return a reusable uint8 scratch array of the given shape for this thread
+        
+        Buffers only grow, so a run over many similar ROIs allocates each one once.
+        The returned array is overwritten by the next call with the same name.
+        """
+        buffers = self._ocr_buffers.__dict__
+        size = shape[0] * shape[1]
+        buf = buffers.get(name)
+        if buf is None or buf.size < size:
+            buf = np.empty(size, np.uint8)
+            buffers[name] = buf
+        return buf[:size].reshape(shape)
+    
     def preprocess_roi_for_ocr(self, roi_img):
         """Apply custom preprocessing based on ROI size"""
         # Get dimensions
@@ -715,17 +778,22 @@ class ROIAnalyzerApp:
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
             enhanced = clahe.apply(denoised)
             
-            # Apply unsharp mask for sharpening
-            gaussian = cv2.GaussianBlur(enhanced, (0, 0), 3.0)
-            sharpened = cv2.addWeighted(enhanced, 1.5, gaussian, -0.5, 0)
+            # Apply unsharp mask for sharpening (intermediates go to reused buffers)
+            shape = enhanced.shape
+            gaussian = cv2.GaussianBlur(enhanced, (0, 0), 3.0,
+                                        dst=self._ocr_buffer("gaussian", shape))
+            sharpened = cv2.addWeighted(enhanced, 1.5, gaussian, -0.5, 0,
+                                        dst=self._ocr_buffer("sharpened", shape))
             
             # Try different binarization methods and select the best
             # Method 1: Adaptive thresholding 
             thresh1 = cv2.adaptiveThreshold(sharpened, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                          cv2.THRESH_BINARY, 11, 2)
+                                          cv2.THRESH_BINARY, 11, 2,
+                                          dst=self._ocr_buffer("thresh1", shape))
             
             # Method 2: Otsu's thresholding
-            _, thresh2 = cv2.threshold(sharpened, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            _, thresh2 = cv2.threshold(sharpened, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                                       dst=self._ocr_buffer("thresh2", shape))
             
             # Choose the method that retains more information (more white pixels for dark text on light background)
             if cv2.countNonZero(thresh1) > cv2.countNonZero(thresh2):
@@ -743,6 +811,15 @@ class ROIAnalyzerApp:
             return eroded
         else:
             # Regular preprocessing for larger ROIs
+            # Shrink ROIs with large text towards the OCR-optimal line height first,
+            # so the filters below run on fewer pixels. The scale follows the text
+            # lines, not the ROI, as multi-line blocks are read with --psm 6
+            if self.downscale_large_rois.get() and height > 2 * OCR_TARGET_HEIGHT:
+                line_height = estimate_line_height(gray)
+                if line_height > 2 * OCR_TARGET_HEIGHT:
+                    scale = max(OCR_TARGET_HEIGHT / line_height, OCR_MIN_DOWNSCALE)
+                    gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            
             # Denoise with Gaussian blur
             denoised = cv2.GaussianBlur(gray, (3, 3), 0)
             
@@ -755,14 +832,32 @@ class ROIAnalyzerApp:
             
             return opening
     
+    def run_ocr(self, processed_roi, lang, config):
+        """Run Tesseract on a preprocessed ROI, reusing cached results for identical pixels"""
+        digest = hashlib.blake2b(processed_roi.tobytes(), digest_size=16).digest()
+        key = (digest, processed_roi.shape, lang, config)
+        
+        text = self._ocr_cache.get(key)
+        if text is not None:
+            self._ocr_cache.move_to_end(key)
+            return text
+        
+        text = pytesseract.image_to_string(processed_roi, lang=lang, config=config).strip()
+        
+        self._ocr_cache[key] = text
+        if len(self._ocr_cache) > OCR_CACHE_SIZE:
+            self._ocr_cache.popitem(last=False)
+        
+        return text
+    
     def analyze_rois(self):
         if self.image is None or not self.roi_rectangles:
             logging.warning("No image or ROIs to analyze")
             messagebox.showinfo("Information", "Please load an image and select at least one ROI.")
             return
         
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, "=== ROI Analysis Results ===\n\n")
+        # Report lines per ROI; target matches are added as they come in
+        sections = []
         
         logging.info(f"Analyzing {len(self.roi_rectangles)} ROIs...")
         
@@ -785,14 +880,25 @@ class ROIAnalyzerApp:
         # Prepare a dictionary to store all results
         self.analysis_results = []
         
-        for roi in self.roi_rectangles:
+        # A new analysis supersedes matches still running for an earlier one
+        self._analysis_run += 1
+        run = self._analysis_run
+        pending = 0
+
+        # Normalize all ROI coordinates in one pass: sort corners, clip to the
+        # image bounds (so the extents match the sliced ROI shape) and flag the
+        # small ROIs that need the digit-oriented OCR configuration
+        image_h, image_w = self.image.shape[:2]
+        coords = np.array([r['original_coords'] for r in self.roi_rectangles], dtype=np.int32)
+        xs = np.clip(np.sort(coords[:, 0::2], axis=1), 0, image_w)
+        ys = np.clip(np.sort(coords[:, 1::2], axis=1), 0, image_h)
+        small_mask = ((ys[:, 1] - ys[:, 0]) < 50) | ((xs[:, 1] - xs[:, 0]) < 100)
+
+        for index, (roi, (x1, x2), (y1, y2), is_small_roi) in enumerate(zip(
+                self.roi_rectangles, xs.tolist(), ys.tolist(), small_mask.tolist())):
             roi_num = roi['roi_num']
-            x1, y1, x2, y2 = roi['original_coords']
-            
-            # Make sure coordinates are in the correct order
-            x1, x2 = min(x1, x2), max(x1, x2)
-            y1, y2 = min(y1, y2), max(y1, y2)
-            
+            section = []
+
             # Extract the ROI from the original image
             roi_img = self.image[y1:y2, x1:x2]
             
@@ -809,11 +915,7 @@ class ROIAnalyzerApp:
             try:
                 # Preprocess for better OCR
                 processed_roi = self.preprocess_roi_for_ocr(roi_img)
-                
-                # Check if this is a small ROI
-                height, width = roi_img.shape[:2]
-                is_small_roi = height < 50 or width < 100
-                
+
                 # Configure Tesseract specifically for numbers and small text
                 if is_small_roi or self.numbers_only.get():
                     custom_config = f'--oem 1 --psm 7 -c tessedit_char_whitelist=0123456789.,-'
@@ -821,12 +923,7 @@ class ROIAnalyzerApp:
                     custom_config = f'--oem 1 --psm 6'  # Different PSM mode for regular text
                 
                 # Perform OCR with selected language and configuration
-                text = pytesseract.image_to_string(
-                    processed_roi, 
-                    lang=self.ocr_lang.get(),
-                    config=custom_config
-                )
-                text = text.strip()
+                text = self.run_ocr(processed_roi, self.ocr_lang.get(), custom_config)
                 
                 # Display ROI source information if available
                 roi_source = ""
@@ -836,8 +933,8 @@ class ROIAnalyzerApp:
                     if template_name and roi_type:
                         roi_source = f" (From template: {template_name}, Type: {roi_type})"
                 
-                self.results_text.insert(tk.END, f"ROI {roi_num} ({roi.get('name', f'ROI {roi_num}')}{roi_source}):\n")
-                self.results_text.insert(tk.END, f"  - Extracted Text: {text if text else 'None detected'}\n")
+                section.append(f"ROI {roi_num} ({roi.get('name', f'ROI {roi_num}')}{roi_source}):\n")
+                section.append(f"  - Extracted Text: {text if text else 'None detected'}\n")
                 
                 roi_result["ocr_text"] = text
                 
@@ -851,42 +948,110 @@ class ROIAnalyzerApp:
                 logging.info(f"OCR completed for ROI {roi_num}")
             except Exception as e:
                 error_msg = f"OCR error for ROI {roi_num}: {str(e)}"
-                self.results_text.insert(tk.END, f"  - OCR Error: {error_msg}\n")
+                section.append(f"  - OCR Error: {error_msg}\n")
                 logging.error(error_msg)
                 roi_result["ocr_error"] = str(e)
             
-            # Check for target images if available
-            if has_targets:
-                try:
-                    # Check all target images against this ROI
-                    matches = check_target_matches(
-                        roi_img, 
-                        targets, 
-                        self.match_method.get(), 
-                        self.match_threshold.get()
-                    )
-                    
-                    if matches:
-                        self.results_text.insert(tk.END, f"  - Target Images Found:\n")
-                        for match in matches:
-                            match_msg = f"    * '{match['description']}' with {match['confidence']:.2f} confidence\n"
-                            self.results_text.insert(tk.END, match_msg)
-                            logging.info(f"Target '{match['description']}' found in ROI {roi_num}")
-                        
-                        roi_result["target_matches"] = matches
-                    else:
-                        self.results_text.insert(tk.END, f"  - No target images found in this ROI\n")
-                        logging.info(f"No target images found in ROI {roi_num}")
-                        
-                except Exception as e:
-                    error_msg = f"Image matching error for ROI {roi_num}: {str(e)}"
-                    self.results_text.insert(tk.END, f"  - {error_msg}\n")
-                    logging.error(error_msg)
-                    roi_result["target_match_error"] = str(e)
+            # Check for target images if available, unless the ROI's template
+            # marks it as text-only
+            template_info = roi.get('template_info') or {}
+            skip_match = template_info.get('skip_match', False)
+            
+            if has_targets and not skip_match:
+                # Check all target images against this ROI on the worker pool;
+                # the results are collected on this thread by _collect_target_matches
+                self.target_manager.check_target_matches_async(
+                    roi_img, 
+                    targets, 
+                    self.match_method.get(), 
+                    self.match_threshold.get(),
+                    token=(run, index)
+                )
+                pending += 1
             
-            self.results_text.insert(tk.END, "\n")
+            sections.append(section)
             self.analysis_results.append(roi_result)
         
+        self._analysis = {
+            "run": run,
+            "sections": sections,
+            "pending": pending,
+            "window_dimensions": window_dimensions
+        }
+        
+        if pending:
+            # Show the OCR results now and finish once the matches are in
+            self._show_report(sections, footer=f"Matching target images in {pending} ROIs...\n")
+            self.root.after(50, self._collect_target_matches, run)
+        else:
+            self._finish_analysis()
+    
+    def _collect_target_matches(self, run):
+        """Add finished background target matches to the current analysis
+        
+        Polls the target manager's result queue from the Tk thread, like the
+        real-time monitor does, until every ROI of the analysis is matched.
+        """
+        analysis = self._analysis
+        if analysis is None or analysis["run"] != run:
+            return  # A newer analysis has taken over
+        
+        try:
+            while True:
+                (match_run, index), matches, error = self.target_manager.result_queue.get_nowait()
+                if match_run != run:
+                    continue  # Left over from an earlier analysis
+                
+                self._record_target_matches(index, matches, error)
+                analysis["pending"] -= 1
+        except queue.Empty:
+            pass
+        
+        if analysis["pending"] > 0:
+            self.root.after(50, self._collect_target_matches, run)
+        else:
+            self._finish_analysis()
+    
+    def _record_target_matches(self, index, matches, error):
+        """Store the target matches (or the matching error) of one analyzed ROI"""
+        roi_result = self.analysis_results[index]
+        section = self._analysis["sections"][index]
+        roi_num = roi_result["roi_num"]
+        
+        if error is not None:
+            error_msg = f"Image matching error for ROI {roi_num}: {str(error)}"
+            section.append(f"  - {error_msg}\n")
+            logging.error(error_msg)
+            roi_result["target_match_error"] = str(error)
+        elif matches:
+            section.append(f"  - Target Images Found:\n")
+            for match in matches:
+                match_msg = f"    * '{match['description']}' with {match['confidence']:.2f} confidence\n"
+                section.append(match_msg)
+                logging.info(f"Target '{match['description']}' found in ROI {roi_num}")
+            
+            roi_result["target_matches"] = matches
+        else:
+            section.append(f"  - No target images found in this ROI\n")
+            logging.info(f"No target images found in ROI {roi_num}")
+    
+    def _show_report(self, sections, footer=""):
+        """Write the analysis report to the results widget in one go"""
+        report = "=== ROI Analysis Results ===\n\n"
+        report += "".join("".join(section) + "\n" for section in sections) + footer
+        
+        self.results_text.configure(state=tk.NORMAL)
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, report)
+        self.results_text.configure(state=tk.DISABLED)
+    
+    def _finish_analysis(self):
+        """Show the complete report and publish the results of the current analysis"""
+        analysis, self._analysis = self._analysis, None
+        
+        # Show the report
+        self._show_report(analysis["sections"])
+        
         # Update JSON view
         self.update_json_view()
         
@@ -894,7 +1059,7 @@ class ROIAnalyzerApp:
         analysis_metadata = {
             "timestamp": datetime.datetime.now().isoformat(),
             "image_path": self.image_path,
-            "window_dimensions": window_dimensions,
+            "window_dimensions": analysis["window_dimensions"],
             "settings": {
                 "ocr_language": self.ocr_lang.get(),
                 "match_threshold": self.match_threshold.get(),